@@ -12,26 +12,20 @@ Features:
 import streamlit as st
 import pandas as pd
 import numpy as np
+import importlib.util
 
 # -----------------------
 # Optional imports: Prophet, Plotly
 # -----------------------
-USE_PROPHET = True
-try:
-    from prophet import Prophet
-except Exception:
-    USE_PROPHET = False
-
-px_available = True
-try:
-    import plotly.express as px
-except Exception:
-    px_available = False
+# Only probe for them here; Prophet, Plotly and Matplotlib are imported where they are
+# used, so pages that draw nothing (Sales Entry, Help) don't pay their import cost.
+USE_PROPHET = importlib.util.find_spec("prophet") is not None
+px_available = importlib.util.find_spec("plotly") is not None
 
 from datetime import datetime
 from io import BytesIO
-import matplotlib.pyplot as plt
 import smtplib
+import ssl
 from email.message import EmailMessage
 import traceback
 
@@ -41,8 +35,13 @@ st.set_page_config(page_title="📦 Smart Shopkeeper Assistant", layout="wide",
 # ----------------------------
 # SESSION STATE INIT
 # ----------------------------
-if "sales_data" not in st.session_state:
-    st.session_state.sales_data = pd.DataFrame(columns=["Date", "Product", "Quantity"])
+# Sales are stored column-wise: one list per field, with product names interned to int codes
+# (product_codes keeps insertion order, so code i is its i-th key). get_sales_df builds the frame.
+if "sales_qty" not in st.session_state:
+    st.session_state.sales_dates = []
+    st.session_state.sales_codes = []
+    st.session_state.sales_qty = []
+    st.session_state.product_codes = {}
 
 if "selected_product" not in st.session_state:
     st.session_state.selected_product = ""
@@ -53,18 +52,20 @@ if "product_list" not in st.session_state:
         "Soap", "Oil", "Rice", "Salt", "Tissue"
     ]
 
-if "forced_page" not in st.session_state:
-    st.session_state.forced_page = None
-
 # ----------------------------
 # Sidebar MENU + settings + Gmail
 # ----------------------------
-sidebar_page = st.sidebar.selectbox("📌 Menu", ["Sales Entry", "Forecasting", "Inventory Dashboard", "Reports", "Help"])
+# Bottom navigation routes via the ?page= query param; picking from the menu clears it again.
+PAGES = ["Sales Entry", "Forecasting", "Inventory Dashboard", "Reports", "Help"]
+PAGE_SLUGS = {"sales": "Sales Entry", "forecast": "Forecasting", "dashboard": "Inventory Dashboard",
+              "reports": "Reports", "help": "Help"}
+sidebar_page = st.sidebar.selectbox("📌 Menu", PAGES, on_change=lambda: st.query_params.pop("page", None))
 st.sidebar.markdown("---")
 
 st.sidebar.subheader("📈 Forecast Settings")
 forecast_days = st.sidebar.number_input("Forecast Horizon (days)", min_value=3, max_value=60, value=7)
 lead_time_days = st.sidebar.number_input("Lead Time (days)", min_value=1, max_value=14, value=3)
+chart_history_days = st.sidebar.number_input("Chart history window (days)", min_value=7, max_value=730, value=90)
 
 st.sidebar.subheader("📤 Export")
 export_filename = st.sidebar.text_input("Export filename (Excel)", value="shop_report.xlsx")
@@ -73,9 +74,15 @@ st.sidebar.subheader("🔔 Gmail Alerts")
 enable_email = st.sidebar.checkbox("Enable Gmail Alerts", value=False)
 
 # First priority: secrets (recommended). Fall back to entering in sidebar fields if secrets absent.
-secrets_gmail_id = st.secrets.get("gmail_id") if hasattr(st, "secrets") else None
-secrets_gmail_pass = st.secrets.get("gmail_pass") if hasattr(st, "secrets") else None
-secrets_alert_recipient = st.secrets.get("alert_recipient") if hasattr(st, "secrets") else None
+@st.cache_resource
+def smtp_secrets():
+    """(gmail_id, gmail_pass, alert_recipient) from st.secrets, read once per server process."""
+    # no secrets.toml at all: sidebar inputs only (plain .get would raise and show an error)
+    if not st.secrets.load_if_toml_exists():
+        return None, None, None
+    return st.secrets.get("gmail_id"), st.secrets.get("gmail_pass"), st.secrets.get("alert_recipient")
+
+secrets_gmail_id, secrets_gmail_pass, secrets_alert_recipient = smtp_secrets()
 
 if enable_email:
     # show fields but prefill with secrets if available (but do not expose secrets in logs)
@@ -85,11 +92,39 @@ if enable_email:
 else:
     gmail_id_input = gmail_pass_input = alert_recipient_input = ""
 
-page = st.session_state.forced_page if st.session_state.forced_page else sidebar_page
+# short slugs keep the URL readable; full page names from older links still resolve
+page = st.query_params.get("page", sidebar_page)
+page = PAGE_SLUGS.get(page, page)
+if page not in PAGES:
+    page = sidebar_page
 
 # ----------------------------
 # Helper functions: email, export, pdf, charts
 # ----------------------------
+# Keep row-level work vectorized: no DataFrame.iterrows() or .apply(axis=1) anywhere in this
+# file (`grep -nE "^[^#]*(iterrows|apply\(.*axis=1)" app.py` should stay empty). Use NumPy arrays,
+# np.select / np.bincount, or itertuples(index=False) when rows must be formatted.
+def get_smtp(gmail_id, gmail_pass):
+    """
+    Logged-in Gmail SMTP connection, kept in session state and reused across alerts.
+    A NOOP checks it is still alive; a dropped connection (or new credentials) reconnects.
+    """
+    cached = st.session_state.get("smtp_conn")
+    if cached is not None:
+        creds, server = cached
+        try:
+            if creds == (gmail_id, gmail_pass):
+                server.noop()
+                return server
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+    # implicit TLS on 465 saves the STARTTLS upgrade round-trips of port 587
+    server = smtplib.SMTP_SSL("smtp.gmail.com", 465, timeout=15, context=ssl.create_default_context())
+    server.login(gmail_id, gmail_pass)
+    st.session_state.smtp_conn = ((gmail_id, gmail_pass), server)
+    return server
+
 def send_gmail_alert(product, current_stock, reorder_point, avg_demand):
     """
     Sends a low-stock alert via Gmail SMTP.
@@ -121,47 +156,127 @@ def send_gmail_alert(product, current_stock, reorder_point, avg_demand):
             f"Sent by Smart Shopkeeper Assistant."
         )
 
-        server = smtplib.SMTP("smtp.gmail.com", 587, timeout=15)
-        server.ehlo()
-        server.starttls()
-        server.login(gmail_id, gmail_pass)
+        server = get_smtp(gmail_id, gmail_pass)
         server.send_message(msg)
-        server.quit()
         return True, "Email sent"
     except Exception as e:
         # return a readable error; in Streamlit logs full traceback is available if user expands
         return False, str(e)
 
+def get_sales_df():
+    """Sales history as a DataFrame, rebuilt only when rows have been added since the last call."""
+    n_rows = len(st.session_state.sales_qty)
+    cached = st.session_state.get("sales_df_cache")
+    if cached is None or cached[0] != n_rows:
+        products = np.array(list(st.session_state.product_codes), dtype=object)
+        df = pd.DataFrame({
+            "Date": np.asarray(st.session_state.sales_dates, dtype="datetime64[ns]"),
+            "Product": np.take(products, np.asarray(st.session_state.sales_codes, dtype=np.int32)),
+            "Quantity": np.asarray(st.session_state.sales_qty, dtype=np.int32),
+        })
+        cached = (n_rows, df)
+        st.session_state.sales_df_cache = cached
+    return cached[1]
+
+def sorted_sales_df():
+    """Sales history sorted by date; re-sorted only when rows have been added."""
+    n_rows = len(st.session_state.sales_qty)
+    cached = st.session_state.get("sorted_sales_cache")
+    if cached is None or cached[0] != n_rows:
+        cached = (n_rows, get_sales_df().sort_values("Date", kind="stable"))
+        st.session_state.sorted_sales_cache = cached
+    return cached[1]
+
+# Export helpers return bytes and are cached, so reruns with unchanged frames skip serialization.
+@st.cache_data(show_spinner=False, max_entries=16)
 def excel_bytes_multi(all_data, summary_df):
     buf = BytesIO()
-    with pd.ExcelWriter(buf, engine="openpyxl") as writer:
+    with pd.ExcelWriter(buf, engine="xlsxwriter") as writer:
         all_data.to_excel(writer, index=False, sheet_name="SalesRaw")
         summary_df.to_excel(writer, index=False, sheet_name="Summary")
-    buf.seek(0)
-    return buf
+    return buf.getvalue()
 
+@st.cache_data(show_spinner=False, max_entries=16)
 def pdf_quick_report(history_df, forecast_df, product_name):
-    fig, ax = plt.subplots(figsize=(8, 4.5))
-    ax.plot(history_df["Date"], history_df["Quantity"], marker="o", label="Historical")
-    ax.plot(forecast_df["Date"], forecast_df["Predicted Sales"], marker="o", linestyle="--", label="Forecast")
-    ax.set_title(f"Sales Report: {product_name}")
-    ax.set_xlabel("Date")
-    ax.set_ylabel("Units")
-    ax.legend()
-    ax.grid(True)
+    """Draws history + forecast as two polylines straight onto a ReportLab canvas."""
+    from reportlab.pdfgen import canvas
+
+    width, height = 576, 324  # 8 x 4.5 in
+    left, right, bottom, top = 50, width - 20, 45, height - 45
+
+    # scale both series into page coordinates with one min/max pass
+    days = np.concatenate([history_df["Date"].values, forecast_df["Date"].values]).astype("datetime64[D]")
+    units = np.concatenate([
+        history_df["Quantity"].to_numpy(dtype=np.float64),
+        forecast_df["Predicted Sales"].to_numpy(dtype=np.float64),
+    ])
+    offsets = (days - days.min()).astype(np.int64) if days.size else days.astype(np.int64)
+    x_span = max(int(offsets.max()) if offsets.size else 0, 1)
+    y_max = max(float(units.max()) if units.size else 0.0, 1.0)
+    x_pix = left + offsets / x_span * (right - left)
+    y_pix = bottom + units / y_max * (top - bottom)
+    n_hist = len(history_df)
+
     buf = BytesIO()
-    fig.tight_layout()
-    fig.savefig(buf, format="pdf")
-    plt.close(fig)
-    buf.seek(0)
-    return buf
+    c = canvas.Canvas(buf, pagesize=(width, height))
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(left, height - 25, f"Sales Report: {product_name}")
+
+    c.setFont("Helvetica", 8)
+    c.setStrokeColorRGB(0.85, 0.85, 0.85)
+    for frac in (0.25, 0.5, 0.75, 1.0):
+        y = bottom + frac * (top - bottom)
+        c.line(left, y, right, y)
+        c.drawRightString(left - 4, y - 3, f"{frac * y_max:g}")
+    c.setStrokeColorRGB(0, 0, 0)
+    c.line(left, bottom, right, bottom)
+    c.line(left, bottom, left, top)
+    c.drawRightString(left - 4, bottom - 3, "0")
+    if days.size:
+        c.drawString(left, bottom - 12, str(days.min()))
+        c.drawRightString(right, bottom - 12, str(days.max()))
+    c.drawCentredString((left + right) / 2, bottom - 30, "Date")
+    c.saveState()
+    c.translate(12, (bottom + top) / 2)
+    c.rotate(90)
+    c.drawCentredString(0, 0, "Units")
+    c.restoreState()
+
+    series = [
+        ("Historical", slice(0, n_hist), (0.12, 0.47, 0.71), ()),
+        ("Forecast", slice(n_hist, None), (1.0, 0.5, 0.05), (4, 3)),
+    ]
+    for i, (label, part, rgb, dash) in enumerate(series):
+        xs, ys = x_pix[part], y_pix[part]
+        c.setStrokeColorRGB(*rgb)
+        c.setFillColorRGB(*rgb)
+        c.setDash(*dash)
+        c.lines(list(zip(xs[:-1], ys[:-1], xs[1:], ys[1:])))
+        for x, y in zip(xs, ys):
+            c.circle(x, y, 1.8, stroke=0, fill=1)
+        # legend entry
+        lx, ly = right - 90, height - 22 - 12 * i
+        c.line(lx, ly + 3, lx + 18, ly + 3)
+        c.setFillColorRGB(0, 0, 0)
+        c.drawString(lx + 22, ly, label)
+
+    c.showPage()
+    c.save()
+    return buf.getvalue()
 
 # plotting helpers (Plotly optional)
+@st.cache_data(show_spinner=False)
+def plotly_figure(kind, df, x, y, **kwargs):
+    """Builds a plotly.express figure (px.line, px.bar, ...); cached so unchanged charts skip px validation."""
+    import plotly.express as px
+    return getattr(px, kind)(df, x=x, y=y, **kwargs)
+
 def render_line_chart(df, x, y, title=None, use_container_width=True):
     if px_available:
-        fig = px.line(df, x=x, y=y, title=title)
+        fig = plotly_figure("line", df, x, y, title=title)
         st.plotly_chart(fig, use_container_width=use_container_width)
     else:
+        import matplotlib.pyplot as plt
         fig, ax = plt.subplots(figsize=(8, 4.5))
         ax.plot(df[x], df[y], marker="o")
         if title:
@@ -174,9 +289,10 @@ def render_line_chart(df, x, y, title=None, use_container_width=True):
 
 def render_bar_chart(df, x, y, title=None, use_container_width=True):
     if px_available:
-        fig = px.bar(df, x=x, y=y, title=title)
+        fig = plotly_figure("bar", df, x, y, title=title)
         st.plotly_chart(fig, use_container_width=use_container_width)
     else:
+        import matplotlib.pyplot as plt
         fig, ax = plt.subplots(figsize=(8, 4.5))
         ax.bar(df[x].astype(str), df[y])
         if title:
@@ -188,19 +304,140 @@ def render_bar_chart(df, x, y, title=None, use_container_width=True):
         st.pyplot(fig)
         plt.close(fig)
 
+@st.cache_resource(show_spinner=False, max_entries=32)
+def fit_prophet(history_tuple, periods):
+    """
+    Fits Prophet on (date_str, qty) pairs and returns the future-only forecast.
+    Cached on the history itself, so reruns with unchanged data skip the fit.
+    The returned frame is shared across reruns — do not mutate it.
+    """
+    from prophet import Prophet
+
+    dfp = pd.DataFrame(list(history_tuple), columns=["ds", "y"])
+    dfp["ds"] = pd.to_datetime(dfp["ds"])
+    # Only fit a weekly cycle once there are ~4 weeks to estimate it from; keep the trend
+    # changepoints few for short shop histories. Only yhat is used, so skip interval sampling.
+    model = Prophet(
+        weekly_seasonality=len(dfp) >= 28,
+        daily_seasonality=False,
+        yearly_seasonality=False,
+        n_changepoints=min(10, max(2, len(dfp) // 10)),
+        uncertainty_samples=0,
+    )
+    model.fit(dfp)
+    # predict the horizon only; make_future_dataframe would also re-predict the whole history
+    future = pd.DataFrame({"ds": pd.date_range(dfp["ds"].max() + pd.Timedelta(days=1), periods=periods, freq="D")})
+    forecast = model.predict(future)
+    forecast_display = forecast[["ds", "yhat"]].rename(columns={"ds": "Date", "yhat": "Predicted Sales"})
+    forecast_display["Predicted Sales"] = (
+        forecast_display["Predicted Sales"].clip(lower=0).round().astype(np.int32)
+    )
+    return forecast_display
+
+def _trailing_mean(day_offsets, qty, n_days, window):
+    """Mean of the last `window` daily totals; days without sales count as 0."""
+    bucket = np.bincount(day_offsets, weights=qty, minlength=n_days)
+    return bucket[-window:].mean()
+
+def _group_sum(codes, qty, n):
+    """Per-group totals of integer quantities, indexed by pd.factorize codes."""
+    return np.bincount(codes, weights=qty, minlength=n).astype(np.int64)
+
+@st.cache_data(show_spinner=False)
 def naive_forecast(history_df, days_ahead):
     """Fallback when Prophet isn't available or data is tiny."""
-    h = history_df.copy()
-    if h.empty:
+    if history_df.empty:
         future_dates = pd.date_range(start=pd.Timestamp.today(), periods=days_ahead, freq='D')
-        return pd.DataFrame({'Date': future_dates, 'Predicted Sales': [0]*days_ahead})
-    h = h.set_index('Date').resample('D').sum().fillna(0)
-    window = min(7, len(h))
-    last_mean = 0 if window == 0 else h['Quantity'].tail(window).mean()
-    future_dates = pd.date_range(start=h.index.max() + pd.Timedelta(days=1), periods=days_ahead, freq='D')
-    preds = [int(round(last_mean)) for _ in range(days_ahead)]
+        return pd.DataFrame({'Date': future_dates, 'Predicted Sales': np.zeros(days_ahead, dtype=np.int32)})
+    dates = history_df['Date'].values.astype('datetime64[D]')
+    start = dates.min()
+    day_offsets = (dates - start).astype(np.int64)
+    n_days = int(day_offsets.max()) + 1
+    window = min(7, n_days)
+    last_mean = _trailing_mean(day_offsets, history_df['Quantity'].values.astype(np.float64), n_days, window)
+    future_dates = pd.date_range(start=pd.Timestamp(dates.max()) + pd.Timedelta(days=1), periods=days_ahead, freq='D')
+    preds = np.full(days_ahead, int(round(last_mean)), dtype=np.int32)
     return pd.DataFrame({'Date': future_dates, 'Predicted Sales': preds})
 
+def _ets_sweep(mat, alpha):
+    """
+    Final simple-exponential-smoothing level of every row of a (products, days) matrix.
+    The recursion level = alpha*y + (1-alpha)*level unrolls to fixed weights per day,
+    so all products are smoothed with one matrix-vector product.
+    """
+    n_days = mat.shape[1]
+    weights = alpha * (1 - alpha) ** np.arange(n_days - 1, -1, -1, dtype=np.float64)
+    weights[0] = (1 - alpha) ** (n_days - 1)
+    return mat @ weights
+
+@st.cache_data(show_spinner=False)
+def forecast_all_products(sales_df, alpha=0.3):
+    """Smoothed daily demand for every product, as a Series indexed by product name."""
+    codes, uniques = pd.factorize(sales_df["Product"].values, sort=False)
+    days = sales_df["Date"].values.astype("datetime64[D]")
+    day_offsets = (days - days.min()).astype(np.int64)
+    mat = np.zeros((uniques.size, int(day_offsets.max()) + 1))
+    np.add.at(mat, (codes, day_offsets), sales_df["Quantity"].values)
+    return pd.Series(_ets_sweep(mat, alpha), index=uniques)
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def daily_by_product(df):
+    """Gap-free daily (Date, Quantity) history for every product, from a single groupby."""
+    totals = df.groupby(["Product", "Date"], sort=True)["Quantity"].sum()
+    histories = {}
+    for product, daily in totals.groupby(level="Product", sort=False):
+        daily = daily.droplevel("Product")
+        idx = pd.date_range(daily.index.min(), daily.index.max(), freq="D")
+        histories[product] = daily.reindex(idx, fill_value=0).rename_axis("Date").reset_index()
+    return histories
+
+# ttl because the recent window is anchored to today's date
+@st.cache_data(show_spinner=False, ttl=300, max_entries=8)
+def build_summary(df, window_days, lead_time, stocks, forecast_all=False):
+    """
+    Per-product inventory summary for the dashboard. `df` must be sorted by Date (sorted_sales_df).
+    `stocks` is a tuple of (product, current stock) pairs so stock edits are part of the cache key.
+    """
+    # Factorize products once; both totals are bincounts over the same codes. Since df is
+    # date-sorted, the recent window is the tail after a binary search instead of a full mask.
+    recent_from = pd.Timestamp.today() - pd.Timedelta(days=window_days)
+    start = np.searchsorted(df["Date"].values, np.datetime64(recent_from), side="left")
+    codes, uniques = pd.factorize(df["Product"].values, sort=False)
+    qty = df["Quantity"].values.astype(np.int64)
+    summary = pd.DataFrame({
+        "Product": uniques,
+        "TotalSold": _group_sum(codes, qty, uniques.size),
+        "SoldRecent": _group_sum(codes[start:], qty[start:], uniques.size),
+    })
+
+    summary["AvgDailyRecent"] = summary["SoldRecent"] / (window_days if window_days > 0 else 1)
+    summary["CurrentStock"] = summary["Product"].map(dict(stocks)).fillna(0).astype(int)
+    if forecast_all:
+        summary["ForecastAvgDaily"] = summary["Product"].map(forecast_all_products(df)).astype("float32")
+        summary["ReorderPoint"] = summary["ForecastAvgDaily"] * lead_time
+    else:
+        summary["ReorderPoint"] = summary["AvgDailyRecent"] * lead_time
+    summary = summary.astype({
+        "TotalSold": "int32", "SoldRecent": "int32", "CurrentStock": "int32",
+        "AvgDailyRecent": "float32", "ReorderPoint": "float32",
+    })
+
+    cond = [
+        summary["CurrentStock"].values <= 0,
+        summary["CurrentStock"].values < summary["ReorderPoint"].values,
+    ]
+    summary["Health"] = np.select(cond, ["Critical", "Low"], default="Healthy")
+    summary["BadgeColor"] = np.select(cond, ["#D7263D", "#FF8C00"], default="#2ECC71")
+    return summary
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def monthly_sales(df):
+    """Quantity per (month, product); grouped on datetime64[M] buckets, labels stringified after."""
+    month_code = df["Date"].values.astype("datetime64[M]")
+    monthly_agg = df.assign(Month=month_code).groupby(["Month", "Product"])["Quantity"].sum().reset_index()
+    monthly_agg["Month"] = monthly_agg["Month"].dt.strftime("%Y-%m")
+    return monthly_agg
+
 def colored_badge(text, color):
     html = f"""<span style="
         display:inline-block;
@@ -252,19 +489,18 @@ if page == "Sales Entry":
         if not product.strip():
             st.warning("Please enter a product name.")
         else:
-            new_row = {"Date": pd.to_datetime(date), "Product": product.strip(), "Quantity": int(qty)}
-            st.session_state.sales_data = pd.concat(
-                [st.session_state.sales_data, pd.DataFrame([new_row])],
-                ignore_index=True
-            )
+            codes = st.session_state.product_codes
+            st.session_state.sales_dates.append(np.datetime64(date, "D"))
+            st.session_state.sales_codes.append(codes.setdefault(product.strip(), len(codes)))
+            st.session_state.sales_qty.append(int(qty))
             st.success(f"Added sale: {qty} × {product}")
 
     st.markdown("---")
     st.subheader("📋 Sales History")
-    if st.session_state.sales_data.empty:
+    if not st.session_state.sales_qty:
         st.info("No sales yet.")
     else:
-        st.dataframe(st.session_state.sales_data.sort_values("Date", ascending=False))
+        st.dataframe(sorted_sales_df().iloc[::-1])
 
 # ----------------------------
 # PAGE: Forecasting
@@ -272,46 +508,28 @@ if page == "Sales Entry":
 if page == "Forecasting":
     st.title("📈 Forecasting")
 
-    data = st.session_state.sales_data.copy()
+    # read-only: nothing below writes to data, so the memoized frame is shared rather than copied
+    data = get_sales_df()
     if data.empty:
         st.info("No sales data. Please add sales first.")
         st.stop()
 
-    data["Date"] = pd.to_datetime(data["Date"])
-    product_list = sorted(data["Product"].unique())
+    histories = daily_by_product(data)
+    product_list = sorted(histories)
     selected_product = st.selectbox("Select product", product_list)
-
-    prod_hist = (
-        data[data["Product"] == selected_product]
-        .groupby("Date")["Quantity"]
-        .sum()
-        .reset_index()
-        .sort_values("Date")
-    )
-    prod_hist = prod_hist.set_index("Date").asfreq("D").fillna(0).reset_index()
+    prod_hist = histories[selected_product]
 
     st.subheader("Last 30 days")
     st.dataframe(prod_hist.tail(30))
 
     dfp = prod_hist.rename(columns={"Date": "ds", "Quantity": "y"}).copy()
-    dfp["ds"] = pd.to_datetime(dfp["ds"])
     dfp["y"] = pd.to_numeric(dfp["y"], errors="coerce").fillna(0)
 
-    # Decide: Prophet or fallback?
-    if USE_PROPHET and dfp["y"].count() >= 2:
+    # Decide: Prophet or fallback? Under two weeks of history (or no sales at all) Prophet
+    # is slow and no better than the trailing mean, so skip it outright.
+    if USE_PROPHET and len(dfp) >= 14 and dfp["y"].sum() > 0:
         try:
-            model = Prophet(weekly_seasonality=True)
-            model.fit(dfp)
-            future = model.make_future_dataframe(periods=int(forecast_days))
-            forecast = model.predict(future)
-            forecast_display = (
-                forecast[forecast["ds"] > prod_hist["Date"].max()]
-                [["ds", "yhat"]]
-                .rename(columns={"ds": "Date", "yhat": "Predicted Sales"})
-            )
-            forecast_display["Predicted Sales"] = (
-                forecast_display["Predicted Sales"].clip(lower=0).round().astype(int)
-            )
+            forecast_display = fit_prophet(tuple(zip(dfp["ds"].astype(str), dfp["y"])), int(forecast_days))
         except Exception as e:
             st.warning("Prophet failed — using fallback forecast instead.")
             with st.expander("Prophet error (traceback)"):
@@ -327,9 +545,9 @@ if page == "Forecasting":
     st.subheader(f"{forecast_days}-day Forecast")
     st.dataframe(forecast_display)
 
-    # Chart
+    # Chart: only the recent history is plotted; downloads still get the full frame
     combined = pd.concat([
-        prod_hist.rename(columns={"Date": "Date", "Quantity": "Sales"})[["Date", "Sales"]],
+        prod_hist.tail(int(chart_history_days)).rename(columns={"Date": "Date", "Quantity": "Sales"})[["Date", "Sales"]],
         forecast_display.rename(columns={"Date": "Date", "Predicted Sales": "Sales"})[["Date", "Sales"]],
     ])
     render_line_chart(combined, x="Date", y="Sales", title=f"History + Forecast: {selected_product}")
@@ -366,19 +584,20 @@ if page == "Forecasting":
     else:
         st.success("Stock is OK ✔")
 
-    # Downloads
+    # Downloads (only built once asked for, so other widget changes don't regenerate them)
     st.markdown("---")
-    excel_data = excel_bytes_multi(
-        data[data["Product"] == selected_product],
-        forecast_display
-    )
-    st.download_button("📥 Download Forecast Excel", data=excel_data, file_name=f"{selected_product}_forecast.xlsx")
-    pdf_data = pdf_quick_report(
-        prod_hist.rename(columns={"Date": "Date", "Quantity": "Quantity"}).tail(30),
-        forecast_display,
-        selected_product
-    )
-    st.download_button("📄 Download PDF Report", data=pdf_data, file_name=f"{selected_product}_report.pdf")
+    if st.checkbox("Prepare downloads"):
+        excel_data = excel_bytes_multi(
+            data[data["Product"] == selected_product],
+            forecast_display
+        )
+        st.download_button("📥 Download Forecast Excel", data=excel_data, file_name=f"{selected_product}_forecast.xlsx")
+        pdf_data = pdf_quick_report(
+            prod_hist.rename(columns={"Date": "Date", "Quantity": "Quantity"}).tail(30),
+            forecast_display,
+            selected_product
+        )
+        st.download_button("📄 Download PDF Report", data=pdf_data, file_name=f"{selected_product}_report.pdf")
 
 # ----------------------------
 # PAGE: Inventory Dashboard
@@ -386,47 +605,20 @@ if page == "Forecasting":
 if page == "Inventory Dashboard":
     st.title("📊 Inventory Dashboard")
 
-    data = st.session_state.sales_data.copy()
+    data = sorted_sales_df()
     if data.empty:
         st.info("No sales data yet.")
         st.stop()
 
-    data["Date"] = pd.to_datetime(data["Date"])
-
     window_days = st.number_input("Fast-mover window (days)", min_value=7, max_value=90, value=14)
-
-    total_by_product = data.groupby("Product")["Quantity"].sum().reset_index()
-    recent_from = pd.Timestamp.today() - pd.Timedelta(days=window_days)
-    recent = (
-        data[data["Date"] >= recent_from]
-        .groupby("Product")["Quantity"]
-        .sum()
-        .reset_index()
+    forecast_all = st.checkbox(
+        "Forecast all products",
+        help="Base reorder points on an exponentially smoothed daily demand instead of the fast-mover window average.",
     )
 
-    summary = pd.merge(total_by_product, recent, on="Product", how="left").fillna(0)
-    # normalize columns
-    if "Quantity_y" in summary.columns:
-        summary = summary.rename(columns={"Quantity_x": "TotalSold", "Quantity_y": "SoldRecent"})
-    else:
-        summary = summary.rename(columns={"Quantity": "TotalSold"})
-        if "SoldRecent" not in summary.columns:
-            recent_map = recent.set_index("Product")["Quantity"].to_dict()
-            summary["SoldRecent"] = summary["Product"].map(recent_map).fillna(0)
-
-    summary["SoldRecent"] = pd.to_numeric(summary["SoldRecent"], errors="coerce").fillna(0)
-    summary["AvgDailyRecent"] = summary["SoldRecent"] / (window_days if window_days > 0 else 1)
-    summary["CurrentStock"] = summary["Product"].apply(lambda p: st.session_state.get(f"stock_{p}", 0))
-    summary["ReorderPoint"] = summary["AvgDailyRecent"] * lead_time_days
-
-    def health_and_color(r):
-        if r["CurrentStock"] <= 0:
-            return "Critical", "#D7263D"
-        if r["CurrentStock"] < r["ReorderPoint"]:
-            return "Low", "#FF8C00"
-        return "Healthy", "#2ECC71"
-
-    summary[["Health", "BadgeColor"]] = summary.apply(lambda r: pd.Series(health_and_color(r)), axis=1)
+    stock_map = {k[6:]: v for k, v in st.session_state.items() if isinstance(k, str) and k.startswith("stock_")}
+    stocks = tuple(sorted((p, int(stock_map.get(p, 0))) for p in data["Product"].unique()))
+    summary = build_summary(data, int(window_days), int(lead_time_days), stocks, forecast_all)
 
     st.subheader("Product Summary")
     st.dataframe(summary.sort_values(["Health", "TotalSold"], ascending=[True, False]).reset_index(drop=True))
@@ -436,10 +628,12 @@ if page == "Inventory Dashboard":
     if low_items.empty:
         st.success("No low stock items.")
     else:
-        for _, row in low_items.iterrows():
-            prod = row["Product"]
-            badge_html = colored_badge(row["Health"], row["BadgeColor"])
-            st.markdown(f"**{prod}** — Current: `{int(row['CurrentStock'])}` | Reorder: `{int(row['ReorderPoint'])}` | Status: {badge_html}", unsafe_allow_html=True)
+        # one markdown element for all rows instead of one per row
+        rows_html = "<br>".join(
+            f"<b>{r.Product}</b> — Current: <code>{int(r.CurrentStock)}</code> | Reorder: <code>{int(r.ReorderPoint)}</code> | Status: {colored_badge(r.Health, r.BadgeColor)}"
+            for r in low_items.itertuples(index=False)
+        )
+        st.markdown(rows_html, unsafe_allow_html=True)
 
     st.subheader(f"Top movers (last {window_days} days)")
     movers = summary.sort_values("SoldRecent", ascending=False).head(10)
@@ -447,17 +641,24 @@ if page == "Inventory Dashboard":
         render_bar_chart(movers, x="Product", y="SoldRecent", title="Top movers (recent)")
 
     st.subheader("Monthly Sales")
-    monthly = data.copy()
-    monthly["Month"] = monthly["Date"].dt.to_period("M").astype(str)
-    monthly_agg = monthly.groupby(["Month", "Product"])["Quantity"].sum().reset_index()
+    monthly_agg = monthly_sales(data)
     if px_available:
-        fig_month = px.bar(monthly_agg, x="Month", y="Quantity", color="Product", title="Monthly Sales", barmode="group")
+        fig_month = plotly_figure("bar", monthly_agg, "Month", "Quantity", color="Product", title="Monthly Sales", barmode="group")
         st.plotly_chart(fig_month, use_container_width=True)
     else:
         try:
+            import matplotlib.pyplot as plt
             pivot = monthly_agg.pivot(index="Month", columns="Product", values="Quantity").fillna(0)
+            heights = pivot.to_numpy()
+            x = np.arange(len(pivot.index))
+            w = 0.8 / max(len(pivot.columns), 1)
             fig, ax = plt.subplots(figsize=(10, 5))
-            pivot.plot(kind="bar", ax=ax)
+            # one ax.bar call per product, bars offset within each month group
+            for i, prod in enumerate(pivot.columns):
+                ax.bar(x + i * w, heights[:, i], width=w, label=prod)
+            ax.set_xticks(x + w * (len(pivot.columns) - 1) / 2)
+            ax.set_xticklabels(pivot.index)
+            ax.legend()
             ax.set_title("Monthly Sales")
             ax.set_xlabel("Month")
             ax.set_ylabel("Quantity")
@@ -468,19 +669,20 @@ if page == "Inventory Dashboard":
             st.write("Plotly not available and Matplotlib grouped bar failed to render.")
 
     st.markdown("---")
-    excel_buf = excel_bytes_multi(data, summary)
-    st.download_button("📥 Download Inventory Excel", data=excel_buf, file_name=export_filename, mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+    if st.checkbox("Prepare downloads"):
+        excel_buf = excel_bytes_multi(data, summary)
+        st.download_button("📥 Download Inventory Excel", data=excel_buf, file_name=export_filename, mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
 
 # ----------------------------
 # PAGE: Reports
 # ----------------------------
 if page == "Reports":
     st.title("📁 Raw Reports")
-    data = st.session_state.sales_data.copy()
+    data = sorted_sales_df()
     if data.empty:
         st.info("No data.")
     else:
-        st.dataframe(data.sort_values("Date"))
+        st.dataframe(data)
 
 # ----------------------------
 # PAGE: Help
@@ -497,10 +699,14 @@ if page == "Help":
 # ----------------------------
 # Bottom navigation
 # ----------------------------
+# on_click runs before the next script run, so the new page renders without an extra st.rerun()
+def go_to(target):
+    st.query_params["page"] = target
+
 st.markdown("---")
 cols = st.columns(5)
-if cols[0].button("🏠 Sales"): st.session_state.forced_page = "Sales Entry"; st.experimental_rerun()
-if cols[1].button("📈 Forecast"): st.session_state.forced_page = "Forecasting"; st.experimental_rerun()
-if cols[2].button("📊 Dashboard"): st.session_state.forced_page = "Inventory Dashboard"; st.experimental_rerun()
-if cols[3].button("📁 Reports"): st.session_state.forced_page = "Reports"; st.experimental_rerun()
-if cols[4].button("❓ Help"): st.session_state.forced_page = "Help"; st.experimental_rerun()
+cols[0].button("🏠 Sales", on_click=go_to, args=("sales",))
+cols[1].button("📈 Forecast", on_click=go_to, args=("forecast",))
+cols[2].button("📊 Dashboard", on_click=go_to, args=("dashboard",))
+cols[3].button("📁 Reports", on_click=go_to, args=("reports",))
+cols[4].button("❓ Help", on_click=go_to, args=("help",))